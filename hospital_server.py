@@ -1,33 +1,50 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 import uvicorn
 import logging
 from typing import List, Dict, Optional
 import asyncio
+import os
 from datetime import datetime
+import time
 import json
+import orjson
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - INFO under DEV, WARNING in production; LOG_LEVEL overrides
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO" if os.getenv("DEV") else "WARNING").upper())
 logger = logging.getLogger("hospital_service")
 
 app = FastAPI(
     title="Hospital Service",
     description="Hospital data management service",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Request/Response models
+# Compress larger JSON payloads
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Response timestamps, formatted at most once per second
+_timestamp_cache = ["", 0]
+
+def now_iso() -> str:
+    """Current local time in ISO format, at one-second granularity"""
+    second = int(time.time())
+    if second != _timestamp_cache[1]:
+        _timestamp_cache[0] = datetime.fromtimestamp(second).isoformat()
+        _timestamp_cache[1] = second
+    return _timestamp_cache[0]
+
+# Artificial search delay, disabled unless SIMULATE_LATENCY is set
+SIMULATE_LATENCY = bool(os.getenv("SIMULATE_LATENCY"))
+
+# Request models
 class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = None
 
-class HospitalResponse(BaseModel):
-    status: str
-    data: List[Dict]
-    timestamp: str
-    service: str = "hospital"
-
 # Mock hospital data
 HOSPITAL_DATA = [
     {
@@ -59,49 +76,96 @@ HOSPITAL_DATA = [
     }
 ]
 
+# Lowercased search fields, precomputed once since HOSPITAL_DATA is static
+_HOSPITAL_INDEX = [
+    {
+        "name_lc": hospital["name"].lower(),
+        "loc_lc": hospital["location"].lower(),
+        "row": hospital
+    }
+    for hospital in HOSPITAL_DATA
+]
+
+# Hospitals keyed by id for O(1) lookups
+_HOSPITAL_BY_ID = {hospital["id"]: hospital for hospital in HOSPITAL_DATA}
+
+# Keyword index: lowercased specialty -> positions of hospitals offering it.
+# Each distinct specialty is checked against the query once per search.
+_SPECIALTY_INDEX: Dict[str, List[int]] = {}
+for position, hospital in enumerate(HOSPITAL_DATA):
+    for specialty in hospital["specialties"]:
+        _SPECIALTY_INDEX.setdefault(specialty.lower(), []).append(position)
+
+# Pre-serialized bodies for the static GET endpoints. Each is a JSON object
+# with its closing brace stripped, so handlers only append a fresh timestamp.
+def _json_prefix(payload: Dict) -> bytes:
+    return orjson.dumps(payload)[:-1]
+
+def timestamped_response(body_prefix: bytes) -> Response:
+    """Complete a pre-serialized JSON body with the current timestamp"""
+    return Response(
+        content=body_prefix + b',"timestamp":"' + now_iso().encode() + b'"}',
+        media_type="application/json"
+    )
+
+_ALL_HOSPITALS_BODY = _json_prefix({"status": "success", "data": HOSPITAL_DATA, "service": "hospital"})
+_HOSPITAL_BODIES = {
+    hospital_id: _json_prefix({"status": "success", "data": hospital})
+    for hospital_id, hospital in _HOSPITAL_BY_ID.items()
+}
+
+_HEALTH_BODY = _json_prefix({"status": "healthy", "service": "hospital", "version": "1.0.0"})
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "service": "hospital",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
-    }
+    return timestamped_response(_HEALTH_BODY)
+
+# HEAD for the RAG service's lightweight probes, kept out of the OpenAPI schema
+app.add_api_route("/health", health_check, methods=["HEAD"], include_in_schema=False)
 
 # Hospital search endpoint
-@app.post("/search", response_model=HospitalResponse)
+@app.post("/search")
 async def search_hospitals(request: QueryRequest):
     try:
-        logger.info(f"Received hospital search query: {request.query}")
+        logger.info("Received hospital search query: %s", request.query)
         
-        # Simulate processing delay
-        await asyncio.sleep(0.5)
+        # Simulate processing delay (opt-in, for local testing only)
+        if SIMULATE_LATENCY:
+            await asyncio.sleep(0.5)
         
         query_lower = request.query.lower()
         
         # Search logic
+        specialty_hits = {
+            position
+            for specialty, positions in _SPECIALTY_INDEX.items()
+            if specialty in query_lower
+            for position in positions
+        }
+        
         results = []
-        for hospital in HOSPITAL_DATA:
-            if (query_lower in hospital["name"].lower() or 
-                any(specialty.lower() in query_lower for specialty in hospital["specialties"]) or
-                query_lower in hospital["location"].lower()):
-                results.append(hospital)
+        for position, entry in enumerate(_HOSPITAL_INDEX):
+            if (query_lower in entry["name_lc"] or 
+                position in specialty_hits or
+                query_lower in entry["loc_lc"]):
+                results.append(entry["row"])
         
         # If no specific matches, return all hospitals
         if not results:
             results = HOSPITAL_DATA
         
-        logger.info(f"Found {len(results)} hospital matches")
+        logger.info("Found %s hospital matches", len(results))
         
-        return HospitalResponse(
-            status="success",
-            data=results,
-            timestamp=datetime.now().isoformat()
-        )
+        return ORJSONResponse({
+            "status": "success",
+            "data": results,
+            "timestamp": now_iso(),
+            "service": "hospital"
+        })
         
     except Exception as e:
-        logger.error(f"Hospital service error: {str(e)}")
+        logger.error("Hospital service error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Hospital service error: {str(e)}"
@@ -111,32 +175,24 @@ async def search_hospitals(request: QueryRequest):
 @app.get("/hospital/{hospital_id}")
 async def get_hospital(hospital_id: str):
     try:
-        hospital = next((h for h in HOSPITAL_DATA if h["id"] == hospital_id), None)
-        if not hospital:
+        body = _HOSPITAL_BODIES.get(hospital_id)
+        if not body:
             raise HTTPException(status_code=404, detail="Hospital not found")
         
-        return {
-            "status": "success",
-            "data": hospital,
-            "timestamp": datetime.now().isoformat()
-        }
+        return timestamped_response(body)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching hospital {hospital_id}: {str(e)}")
+        logger.error("Error fetching hospital %s: %s", hospital_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get all hospitals
 @app.get("/hospitals")
 async def get_all_hospitals():
     try:
-        return HospitalResponse(
-            status="success",
-            data=HOSPITAL_DATA,
-            timestamp=datetime.now().isoformat()
-        )
+        return timestamped_response(_ALL_HOSPITALS_BODY)
     except Exception as e:
-        logger.error(f"Error fetching all hospitals: {str(e)}")
+        logger.error("Error fetching all hospitals: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -144,6 +200,8 @@ if __name__ == "__main__":
         "hospital_server:app",
         host="0.0.0.0",
         port=8001,
-        reload=True,
+        reload=bool(os.getenv("DEV")),
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
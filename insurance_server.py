@@ -1,32 +1,49 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 import uvicorn
 import logging
 from typing import List, Dict, Optional
 import asyncio
+import os
 from datetime import datetime
+import time
+import orjson
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - INFO under DEV, WARNING in production; LOG_LEVEL overrides
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO" if os.getenv("DEV") else "WARNING").upper())
 logger = logging.getLogger("insurance_service")
 
 app = FastAPI(
     title="Insurance Service",
     description="Insurance plans management service",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Request/Response models
+# Compress larger JSON payloads
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Response timestamps, formatted at most once per second
+_timestamp_cache = ["", 0]
+
+def now_iso() -> str:
+    """Current local time in ISO format, at one-second granularity"""
+    second = int(time.time())
+    if second != _timestamp_cache[1]:
+        _timestamp_cache[0] = datetime.fromtimestamp(second).isoformat()
+        _timestamp_cache[1] = second
+    return _timestamp_cache[0]
+
+# Artificial search delay, disabled unless SIMULATE_LATENCY is set
+SIMULATE_LATENCY = bool(os.getenv("SIMULATE_LATENCY"))
+
+# Request models
 class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = None
 
-class InsuranceResponse(BaseModel):
-    status: str
-    data: List[Dict]
-    timestamp: str
-    service: str = "insurance"
-
 # Mock insurance data
 INSURANCE_DATA = [
     {
@@ -75,35 +92,91 @@ INSURANCE_DATA = [
     }
 ]
 
+# Lowercased search fields, precomputed once since INSURANCE_DATA is static
+_INSURANCE_INDEX = [
+    {
+        "provider_lc": insurance["provider"].lower(),
+        "plan_name_lc": insurance["plan_name"].lower(),
+        "type_lc": insurance["type"].lower(),
+        "row": insurance
+    }
+    for insurance in INSURANCE_DATA
+]
+
+# Plans keyed by id, and network hospital id -> plans accepted there
+_INSURANCE_BY_ID = {insurance["id"]: insurance for insurance in INSURANCE_DATA}
+_COMPATIBLE_BY_HOSPITAL: Dict[str, List[Dict]] = {}
+for insurance in INSURANCE_DATA:
+    for hospital_id in insurance.get("network_hospitals", []):
+        _COMPATIBLE_BY_HOSPITAL.setdefault(hospital_id, []).append(insurance)
+
+# Keyword index: lowercased coverage -> positions of plans including it.
+# Each distinct coverage is checked against the query once per search.
+_COVERAGE_INDEX: Dict[str, List[int]] = {}
+for position, insurance in enumerate(INSURANCE_DATA):
+    for coverage in insurance["coverage"]:
+        _COVERAGE_INDEX.setdefault(coverage.lower(), []).append(position)
+
+# Pre-serialized bodies for the static GET endpoints. Each is a JSON object
+# with its closing brace stripped, so handlers only append a fresh timestamp.
+def _json_prefix(payload: Dict) -> bytes:
+    return orjson.dumps(payload)[:-1]
+
+def timestamped_response(body_prefix: bytes) -> Response:
+    """Complete a pre-serialized JSON body with the current timestamp"""
+    return Response(
+        content=body_prefix + b',"timestamp":"' + now_iso().encode() + b'"}',
+        media_type="application/json"
+    )
+
+_ALL_INSURANCE_BODY = _json_prefix({"status": "success", "data": INSURANCE_DATA, "service": "insurance"})
+_INSURANCE_BODIES = {
+    insurance_id: _json_prefix({"status": "success", "data": insurance})
+    for insurance_id, insurance in _INSURANCE_BY_ID.items()
+}
+_COMPATIBLE_BODIES = {
+    hospital_id: _json_prefix({"status": "success", "data": plans, "service": "insurance"})
+    for hospital_id, plans in _COMPATIBLE_BY_HOSPITAL.items()
+}
+_NO_COMPATIBLE_BODY = _json_prefix({"status": "success", "data": [], "service": "insurance"})
+
+_HEALTH_BODY = _json_prefix({"status": "healthy", "service": "insurance", "version": "1.0.0"})
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "service": "insurance",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
-    }
+    return timestamped_response(_HEALTH_BODY)
+
+# HEAD for the RAG service's lightweight probes, kept out of the OpenAPI schema
+app.add_api_route("/health", health_check, methods=["HEAD"], include_in_schema=False)
 
 # Insurance search endpoint
-@app.post("/search", response_model=InsuranceResponse)
+@app.post("/search")
 async def search_insurance(request: QueryRequest):
     try:
-        logger.info(f"Received insurance search query: {request.query}")
+        logger.info("Received insurance search query: %s", request.query)
         
-        # Simulate processing delay
-        await asyncio.sleep(0.3)
+        # Simulate processing delay (opt-in, for local testing only)
+        if SIMULATE_LATENCY:
+            await asyncio.sleep(0.3)
         
         query_lower = request.query.lower()
         
         # Search logic
+        coverage_hits = {
+            position
+            for coverage, positions in _COVERAGE_INDEX.items()
+            if coverage in query_lower
+            for position in positions
+        }
+        
         results = []
-        for insurance in INSURANCE_DATA:
-            if (query_lower in insurance["provider"].lower() or
-                query_lower in insurance["plan_name"].lower() or
-                query_lower in insurance["type"].lower() or
-                any(coverage.lower() in query_lower for coverage in insurance["coverage"])):
-                results.append(insurance)
+        for position, entry in enumerate(_INSURANCE_INDEX):
+            if (query_lower in entry["provider_lc"] or
+                query_lower in entry["plan_name_lc"] or
+                query_lower in entry["type_lc"] or
+                position in coverage_hits):
+                results.append(entry["row"])
         
         # Budget-based filtering
         if "cheap" in query_lower or "affordable" in query_lower or "budget" in query_lower:
@@ -115,16 +188,17 @@ async def search_insurance(request: QueryRequest):
         if not results:
             results = INSURANCE_DATA
         
-        logger.info(f"Found {len(results)} insurance matches")
+        logger.info("Found %s insurance matches", len(results))
         
-        return InsuranceResponse(
-            status="success",
-            data=results,
-            timestamp=datetime.now().isoformat()
-        )
+        return ORJSONResponse({
+            "status": "success",
+            "data": results,
+            "timestamp": now_iso(),
+            "service": "insurance"
+        })
         
     except Exception as e:
-        logger.error(f"Insurance service error: {str(e)}")
+        logger.error("Insurance service error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Insurance service error: {str(e)}"
@@ -134,50 +208,33 @@ async def search_insurance(request: QueryRequest):
 @app.get("/insurance/{insurance_id}")
 async def get_insurance(insurance_id: str):
     try:
-        insurance = next((ins for ins in INSURANCE_DATA if ins["id"] == insurance_id), None)
-        if not insurance:
+        body = _INSURANCE_BODIES.get(insurance_id)
+        if not body:
             raise HTTPException(status_code=404, detail="Insurance plan not found")
         
-        return {
-            "status": "success",
-            "data": insurance,
-            "timestamp": datetime.now().isoformat()
-        }
+        return timestamped_response(body)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching insurance {insurance_id}: {str(e)}")
+        logger.error("Error fetching insurance %s: %s", insurance_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get compatible insurance for hospital
 @app.get("/compatible/{hospital_id}")
 async def get_compatible_insurance(hospital_id: str):
     try:
-        compatible_plans = [
-            ins for ins in INSURANCE_DATA 
-            if hospital_id in ins.get("network_hospitals", [])
-        ]
-        
-        return InsuranceResponse(
-            status="success",
-            data=compatible_plans,
-            timestamp=datetime.now().isoformat()
-        )
+        return timestamped_response(_COMPATIBLE_BODIES.get(hospital_id, _NO_COMPATIBLE_BODY))
     except Exception as e:
-        logger.error(f"Error finding compatible insurance: {str(e)}")
+        logger.error("Error finding compatible insurance: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get all insurance plans
 @app.get("/insurance")
 async def get_all_insurance():
     try:
-        return InsuranceResponse(
-            status="success",
-            data=INSURANCE_DATA,
-            timestamp=datetime.now().isoformat()
-        )
+        return timestamped_response(_ALL_INSURANCE_BODY)
     except Exception as e:
-        logger.error(f"Error fetching all insurance: {str(e)}")
+        logger.error("Error fetching all insurance: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -185,6 +242,8 @@ if __name__ == "__main__":
         "insurance_server:app",
         host="0.0.0.0",
         port=8002,
-        reload=True,
+        reload=bool(os.getenv("DEV")),
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
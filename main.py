@@ -1,23 +1,63 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 import httpx
+import redis.asyncio as redis
+import orjson
+import hashlib
 import logging
+import os
 from typing import Dict, Any, Optional
 from datetime import datetime
+import time
 import asyncio
 import json
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import IntEnum
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - INFO under DEV, WARNING in production; LOG_LEVEL overrides
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO" if os.getenv("DEV") else "WARNING").upper())
 logger = logging.getLogger("gateway_service")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared HTTP client and query cache connection for the app's lifetime"""
+    global REDIS
+    app.state.http = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_keepalive_connections=64,
+            max_connections=MAX_CONCURRENT_PER_SERVICE * len(SERVICES),
+            keepalive_expiry=30.0
+        ),
+        http2=True
+    )
+    if REDIS_URL:
+        # Short socket timeouts: an unresponsive cache must fail fast into the
+        # RedisError handling rather than stall every query
+        REDIS = redis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT
+        )
+    
+    yield
+    
+    await app.state.http.aclose()
+    if REDIS is not None:
+        await REDIS.aclose()
+
 app = FastAPI(
     title="Healthcare Gateway Service",
     description="Main gateway for healthcare application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -29,6 +69,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (full hospital/insurance listings)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Response timestamps, formatted at most once per second
+_timestamp_cache = ["", 0]
+
+def now_iso() -> str:
+    """Current local time in ISO format, at one-second granularity"""
+    second = int(time.time())
+    if second != _timestamp_cache[1]:
+        _timestamp_cache[0] = datetime.fromtimestamp(second).isoformat()
+        _timestamp_cache[1] = second
+    return _timestamp_cache[0]
+
 # Service URLs - Updated for Railway deployment
 SERVICES = {
     "hospital": "https://affectionate-benevolence-production-641e.up.railway.app",
@@ -36,114 +90,285 @@ SERVICES = {
     "rag": "https://selfless-joy-production.up.railway.app"
 }
 
+# Full URLs for the endpoints the gateway calls, built once
+_URLS: Dict[tuple, str] = {
+    (name, endpoint): f"{base_url}/{endpoint}"
+    for name, base_url in SERVICES.items()
+    for endpoint in ("health", "search", "query", "query_batch")
+}
+
 REQUEST_TIMEOUT = 15.0
 
+# Outbound bodies are pre-encoded with orjson and sent as raw content
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Cap in-flight requests per downstream service; excess callers queue here
+# instead of piling pending sockets onto a struggling service
+MAX_CONCURRENT_PER_SERVICE = 32
+SERVICE_SEMAPHORES = {name: asyncio.Semaphore(MAX_CONCURRENT_PER_SERVICE) for name in SERVICES}
+
+# Query response cache - enabled when REDIS_URL is set
+REDIS_URL = os.getenv("REDIS_URL")
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))  # seconds
+REDIS_SOCKET_TIMEOUT = 0.2  # seconds
+REDIS: Optional[redis.Redis] = None
+cache_stats = {"hits": 0, "misses": 0}
+
 # Request models
 class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = None
 
-class HealthCheckResponse(BaseModel):
-    status: str
-    services: Dict[str, Dict[str, Any]]
-    timestamp: str
+# Circuit breaker: CLOSED passes calls through; MAX_FAILURES consecutive
+# failures trip it OPEN for CIRCUIT_TIMEOUT; then HALF_OPEN lets one probe
+# through at a time and closes again after SUCCESS_THRESHOLD successes.
+# The helpers below never await, so each update runs atomically on the
+# event loop and needs no lock.
+class CBState(IntEnum):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
 
-# Circuit breaker state
-circuit_breaker = {
-    "hospital": {"failures": 0, "last_failure": None, "open": False},
-    "insurance": {"failures": 0, "last_failure": None, "open": False},
-    "rag": {"failures": 0, "last_failure": None, "open": False}
-}
+@dataclass(slots=True)
+class Breaker:
+    state: CBState = CBState.CLOSED
+    failures: int = 0
+    successes: int = 0
+    opened_at: float = 0.0  # time.monotonic() when tripped
+    probe_started: float = 0.0  # time.monotonic() of the in-flight HALF_OPEN probe, 0 if none
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.name.lower(),
+            "open": self.state is not CBState.CLOSED,
+            "failures": self.failures
+        }
+
+circuit_breakers: Dict[str, Breaker] = {name: Breaker() for name in SERVICES}
 
 MAX_FAILURES = 3
+SUCCESS_THRESHOLD = 2
 CIRCUIT_TIMEOUT = 60  # seconds
 
-def should_call_service(service_name: str) -> bool:
+def trip_breaker(service_name: str, breaker: Breaker):
+    """Open the circuit for a service"""
+    breaker.state = CBState.OPEN
+    breaker.opened_at = time.monotonic()
+    breaker.probe_started = 0.0
+    logger.warning("Circuit breaker opened for %s", service_name)
+
+def should_call_service(service_name: str, breaker: Breaker) -> bool:
     """Check if service should be called based on circuit breaker state"""
-    breaker = circuit_breaker[service_name]
-    
-    if not breaker["open"]:
+    if breaker.state is CBState.CLOSED:
         return True
     
-    # Check if circuit should be reset
-    if breaker["last_failure"]:
-        time_since_failure = (datetime.now() - breaker["last_failure"]).total_seconds()
-        if time_since_failure > CIRCUIT_TIMEOUT:
-            breaker["failures"] = 0
-            breaker["open"] = False
-            breaker["last_failure"] = None
-            logger.info(f"Circuit breaker reset for {service_name}")
-            return True
+    now = time.monotonic()
+    if breaker.state is CBState.OPEN:
+        if now - breaker.opened_at <= CIRCUIT_TIMEOUT:
+            return False
+        breaker.state = CBState.HALF_OPEN
+        breaker.successes = 0
+        breaker.probe_started = 0.0
+        logger.info("Circuit breaker half-open for %s", service_name)
     
-    return False
+    # HALF_OPEN: one probe at a time; a probe that never reported back
+    # (e.g. a cancelled request) expires after REQUEST_TIMEOUT
+    if breaker.probe_started and now - breaker.probe_started < REQUEST_TIMEOUT:
+        return False
+    breaker.probe_started = now
+    return True
 
-def record_service_failure(service_name: str):
+def record_service_failure(service_name: str, breaker: Breaker):
     """Record service failure and potentially open circuit breaker"""
-    breaker = circuit_breaker[service_name]
-    breaker["failures"] += 1
-    breaker["last_failure"] = datetime.now()
-    
-    if breaker["failures"] >= MAX_FAILURES:
-        breaker["open"] = True
-        logger.warning(f"Circuit breaker opened for {service_name}")
-
-def record_service_success(service_name: str):
-    """Record service success and reset failure count"""
-    breaker = circuit_breaker[service_name]
-    if breaker["failures"] > 0:
-        breaker["failures"] = 0
-        breaker["last_failure"] = None
-        breaker["open"] = False
-
-async def call_service(service_name: str, endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Optional[Dict]:
-    """Make a resilient call to a service with circuit breaker pattern"""
+    if breaker.state is CBState.HALF_OPEN:
+        trip_breaker(service_name, breaker)
+        return
     
-    if not should_call_service(service_name):
-        logger.warning(f"Circuit breaker open for {service_name}, skipping call")
+    breaker.failures += 1
+    if breaker.state is CBState.CLOSED and breaker.failures >= MAX_FAILURES:
+        trip_breaker(service_name, breaker)
+
+def record_service_success(service_name: str, breaker: Breaker):
+    """Record service success; close a half-open circuit after enough successes"""
+    if breaker.state is CBState.HALF_OPEN:
+        breaker.probe_started = 0.0
+        breaker.successes += 1
+        if breaker.successes >= SUCCESS_THRESHOLD:
+            breaker.state = CBState.CLOSED
+            breaker.failures = 0
+            logger.info("Circuit breaker closed for %s", service_name)
+    elif breaker.failures > 0:
+        breaker.failures = 0
+
+def query_cache_key(query: str) -> str:
+    """Build the cache key for a normalized query"""
+    digest = hashlib.blake2b(query.lower().strip().encode(), digest_size=16).hexdigest()
+    return f"q:{digest}"
+
+async def get_cached_response(key: str) -> Optional[Dict]:
+    """Return a cached query response, or None on miss or cache failure"""
+    if REDIS is None:
         return None
     
     try:
-        service_url = SERVICES[service_name]
-        url = f"{service_url}/{endpoint.lstrip('/')}"
+        cached = await REDIS.get(key)
+    except redis.RedisError as e:
+        logger.warning("Query cache read failed: %s", e)
+        return None
+    
+    if cached is None:
+        cache_stats["misses"] += 1
+        return None
+    
+    cache_stats["hits"] += 1
+    return orjson.loads(cached)
+
+async def cache_response(key: str, response: Dict):
+    """Store a query response in the cache; failures are logged and ignored"""
+    if REDIS is None:
+        return
+    
+    try:
+        await REDIS.setex(key, QUERY_CACHE_TTL, orjson.dumps(response))
+    except redis.RedisError as e:
+        logger.warning("Query cache write failed: %s", e)
+
+def is_cacheable_answer(rag_response: Dict) -> bool:
+    """Only complete RAG answers are cached; outage answers must not outlive the outage"""
+    if rag_response.get("status") != "success" or rag_response.get("degraded"):
+        return False
+    # Older RAG deployments don't send "degraded"; check the sources directly
+    sources = rag_response.get("sources") or {}
+    return not any(
+        isinstance(source, dict) and (source.get("data") or {}).get("status") == "unavailable"
+        for source in sources.values()
+    )
+
+# Endpoints a service may not serve yet (the gateway can deploy before the
+# service). A 404/405 from one of these is not a breaker failure; the
+# caller gets EndpointNotSupported and falls back to an older endpoint.
+OPTIONAL_ENDPOINTS = {"query_batch"}
+
+class EndpointNotSupported(Exception):
+    pass
+
+# Downstream calls that are safe to coalesce: every GET plus these POSTs
+IDEMPOTENT_POST_ENDPOINTS = {"search"}
+_inflight_calls: Dict[tuple, asyncio.Task] = {}
+
+async def call_service(service_name: str, endpoint: str, method: str = "GET", data: Optional[Dict] = None,
+                       timeout: Optional[httpx.Timeout] = None) -> Optional[Dict]:
+    """Make a resilient call to a service, sharing identical in-flight idempotent calls.
+    
+    timeout overrides the client's REQUEST_TIMEOUT for this call.
+    """
+    method = method.upper()
+    if method != "GET" and endpoint.lstrip("/") not in IDEMPOTENT_POST_ENDPOINTS:
+        return await _call_service(service_name, endpoint, method, data, timeout)
+    
+    key = (service_name, endpoint, method, orjson.dumps(data, option=orjson.OPT_SORT_KEYS))
+    task = _inflight_calls.get(key)
+    if task is None:
+        task = asyncio.create_task(_call_service(service_name, endpoint, method, data, timeout))
+        _inflight_calls[key] = task
+        task.add_done_callback(lambda _: _inflight_calls.pop(key, None))
+    
+    # Shield so one cancelled caller does not cancel the call for the others
+    return await asyncio.shield(task)
+
+# Last good responses, served as a stale fallback when a call fails or the
+# circuit breaker is open. Entries stay usable for STALE_TTL_HEALTHY after a
+# plain failure and STALE_TTL_OPEN while the breaker is open. Health probes
+# never fall back, so /health keeps reporting real outages; RAG batches are
+# tracked per query by RagBatcher instead.
+STALE_CACHE_MAXSIZE = 1024
+STALE_TTL_HEALTHY = 5.0  # seconds
+STALE_TTL_OPEN = 60.0  # seconds
+NO_STALE_FALLBACK_ENDPOINTS = {"health", "query_batch"}
+_stale_responses: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+def stale_cache_key(service_name: str, endpoint: str, data: Optional[Dict]) -> Optional[tuple]:
+    """Key a call for the stale fallback cache, or None if it must not fall back"""
+    if endpoint.lstrip("/") in NO_STALE_FALLBACK_ENDPOINTS:
+        return None
+    digest = hashlib.blake2b(orjson.dumps(data, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+    return (service_name, endpoint, digest)
+
+def remember_response(key: Optional[tuple], result: Dict):
+    """Store a successful response for later stale fallback"""
+    if key is None:
+        return
+    _stale_responses[key] = (time.monotonic(), result)
+    _stale_responses.move_to_end(key)
+    if len(_stale_responses) > STALE_CACHE_MAXSIZE:
+        _stale_responses.popitem(last=False)
+
+def stale_response(service_name: str, key: Optional[tuple]) -> Optional[Dict]:
+    """Return a recent successful response for this call, if one is still usable"""
+    entry = _stale_responses.get(key) if key is not None else None
+    if entry is None:
+        return None
+    
+    ttl = STALE_TTL_OPEN if circuit_breakers[service_name].state is not CBState.CLOSED else STALE_TTL_HEALTHY
+    if time.monotonic() - entry[0] > ttl:
+        return None
+    
+    logger.warning("Serving cached %s response as fallback", service_name)
+    return entry[1]
+
+async def _call_service(service_name: str, endpoint: str, method: str = "GET", data: Optional[Dict] = None,
+                        timeout: Optional[httpx.Timeout] = None) -> Optional[Dict]:
+    """Make a resilient call to a service with circuit breaker pattern"""
+    
+    cache_key = stale_cache_key(service_name, endpoint, data)
+    
+    # Resolve the breaker once; the helpers below update it in place
+    breaker = circuit_breakers[service_name]
+    if not should_call_service(service_name, breaker):
+        logger.warning("Circuit breaker open for %s, skipping call", service_name)
+        return stale_response(service_name, cache_key)
+    
+    try:
+        url = _URLS.get((service_name, endpoint)) or f"{SERVICES[service_name]}/{endpoint.lstrip('/')}"
         
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            if method.upper() == "POST":
-                response = await client.post(url, json=data or {})
+        client = app.state.http
+        request_timeout = timeout or httpx.USE_CLIENT_DEFAULT
+        async with SERVICE_SEMAPHORES[service_name]:
+            if method == "POST":
+                response = await client.post(url, content=orjson.dumps(data or {}), headers=JSON_HEADERS,
+                                             timeout=request_timeout)
             else:
-                response = await client.get(url)
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            record_service_success(service_name)
-            logger.info(f"Successfully called {service_name} service")
-            return result
+                response = await client.get(url, timeout=request_timeout)
+        
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        
+        record_service_success(service_name, breaker)
+        remember_response(cache_key, result)
+        return result
             
     except httpx.TimeoutException:
-        logger.error(f"{service_name} service timeout")
-        record_service_failure(service_name)
+        logger.error("%s service timeout", service_name)
+        record_service_failure(service_name, breaker)
     except httpx.RequestError as e:
-        logger.error(f"{service_name} service connection error: {str(e)}")
-        record_service_failure(service_name)
+        logger.error("%s service connection error: %s", service_name, e)
+        record_service_failure(service_name, breaker)
     except httpx.HTTPStatusError as e:
-        logger.error(f"{service_name} service HTTP error: {e.response.status_code}")
-        record_service_failure(service_name)
+        if e.response.status_code in (404, 405) and endpoint.lstrip("/") in OPTIONAL_ENDPOINTS:
+            # The service answered, it just predates this endpoint; release
+            # a half-open probe without counting it either way
+            breaker.probe_started = 0.0
+            raise EndpointNotSupported(f"{service_name} does not serve /{endpoint.lstrip('/')}") from e
+        logger.error("%s service HTTP error: %s", service_name, e.response.status_code)
+        record_service_failure(service_name, breaker)
     except Exception as e:
-        logger.error(f"{service_name} service unexpected error: {str(e)}")
-        record_service_failure(service_name)
+        logger.error("%s service unexpected error: %s", service_name, e)
+        record_service_failure(service_name, breaker)
     
-    return None
+    return stale_response(service_name, cache_key)
 
-# Serve frontend
-@app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    """Serve the frontend HTML file"""
-    try:
-        with open("index.html", "r", encoding="utf-8") as file:
-            return HTMLResponse(content=file.read())
-    except FileNotFoundError:
-        return HTMLResponse(
-            content="""
+# Serve frontend - the page is read once at import, not on every request
+FALLBACK_HTML = """
             <html>
                 <body>
                     <h1>HealthGuard AI Railway</h1>
@@ -156,63 +381,232 @@ async def serve_frontend():
                     </ul>
                 </body>
             </html>
-            """,
-            status_code=200
-        )
+            """
 
-# Health check endpoint
-@app.get("/health", response_model=HealthCheckResponse)
-async def health_check():
-    """Comprehensive health check for all services"""
+try:
+    with open("index.html", "rb") as file:
+        INDEX_HTML = file.read()
+except FileNotFoundError:
+    INDEX_HTML = FALLBACK_HTML.encode()
+
+@app.get("/", response_class=HTMLResponse)
+async def serve_frontend():
+    """Serve the frontend HTML file"""
+    return HTMLResponse(content=INDEX_HTML)
+
+# Successful downstream /health responses are reused briefly so frequent
+# monitor polling does not hit every service on each probe
+HEALTH_CACHE_TTL = 5.0  # seconds
+_health_cache: Dict[str, tuple] = {}
+
+# /health answers within HEALTH_PROBE_DEADLINE even if a service hangs;
+# each probe also uses a short per-call timeout instead of REQUEST_TIMEOUT
+HEALTH_PROBE_DEADLINE = 2.0  # seconds
+HEALTH_PROBE_TIMEOUT = httpx.Timeout(1.5, connect=1.0)
+
+async def probe_service_health(service_name: str) -> Optional[Dict]:
+    """GET a service's /health directly, or None if it fails.
+    
+    Probes bypass the circuit breaker: their short timeout says nothing about
+    whether real traffic (REQUEST_TIMEOUT) would succeed, so a slow /health
+    only shows up as unhealthy in the report.
+    """
+    try:
+        response = await app.state.http.get(_URLS[(service_name, "health")], timeout=HEALTH_PROBE_TIMEOUT)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except Exception as e:
+        logger.warning("%s health probe failed: %r", service_name, e)
+        return None
+
+async def get_service_health(service_name: str, fresh: bool = False) -> Optional[Dict]:
+    """Return a service's health response, cached for HEALTH_CACHE_TTL unless fresh"""
+    cached = None if fresh else _health_cache.get(service_name)
+    if cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+        return cached[1]
+    
+    health_data = await probe_service_health(service_name)
+    if health_data:
+        _health_cache[service_name] = (time.monotonic(), health_data)
+    return health_data
+
+# The aggregated health report is reused for HEALTH_REPORT_TTL so
+# back-to-back /health calls do not re-probe; concurrent misses share
+# one probe via the lock
+HEALTH_REPORT_TTL = 1.0  # seconds
+_health_report = {"ts": 0.0, "value": None}
+_health_report_lock = asyncio.Lock()
+
+def cached_health_report() -> Optional[Dict]:
+    """Return the last health report if it is younger than HEALTH_REPORT_TTL"""
+    if _health_report["value"] is not None and time.monotonic() - _health_report["ts"] < HEALTH_REPORT_TTL:
+        return _health_report["value"]
+    return None
+
+async def build_health_report(fresh: bool = False) -> Dict:
+    """Probe all services and build the aggregated health report"""
     services_health = {}
     
-    # Check all services
-    for service_name in SERVICES.keys():
-        health_data = await call_service(service_name, "health")
-        
+    # Probe all services concurrently; any probe still running at the
+    # deadline is cancelled and its service reported unhealthy
+    probes = {name: asyncio.create_task(get_service_health(name, fresh)) for name in SERVICES}
+    done, pending = await asyncio.wait(probes.values(), timeout=HEALTH_PROBE_DEADLINE)
+    for probe in pending:
+        probe.cancel()
+    
+    for service_name, probe in probes.items():
+        health_data = probe.result() if probe in done else None
         services_health[service_name] = {
             "status": "healthy" if health_data else "unhealthy",
-            "circuit_breaker": {
-                "open": circuit_breaker[service_name]["open"],
-                "failures": circuit_breaker[service_name]["failures"]
-            },
+            "circuit_breaker": circuit_breakers[service_name].as_dict(),
             "last_response": health_data
         }
     
     # Overall system status
     all_healthy = all(service["status"] == "healthy" for service in services_health.values())
     
-    return HealthCheckResponse(
-        status="healthy" if all_healthy else "degraded",
-        services=services_health,
-        timestamp=datetime.now().isoformat()
-    )
+    return {
+        "status": "healthy" if all_healthy else "degraded",
+        "services": services_health,
+        "timestamp": now_iso()
+    }
+
+# Health check endpoint
+@app.get("/health")
+async def health_check(fresh: bool = False):
+    """Comprehensive health check for all services; ?fresh=1 bypasses the cache"""
+    report = None if fresh else cached_health_report()
+    if report is None:
+        async with _health_report_lock:
+            # Another request may have refreshed the report while we waited
+            report = None if fresh else cached_health_report()
+            if report is None:
+                report = await build_health_report(fresh)
+                _health_report["ts"] = time.monotonic()
+                _health_report["value"] = report
+    
+    return ORJSONResponse(report)
+
+class RagBatcher:
+    """Submit concurrent RAG queries to the RAG service's /query_batch endpoint.
+    
+    Queries arriving within max_queue_time (or until max_batch_size is
+    reached) are sent as one downstream call. Identical (query, user_id)
+    pairs pending in the same window share a single result.
+    
+    A RAG deployment without /query_batch is sent per-query /query calls
+    instead; batching is retried every unsupported_retry seconds.
+    """
+    
+    def __init__(self, max_batch_size: int = 16, max_queue_time: float = 0.03, unsupported_retry: float = 300.0):
+        self.max_batch_size = max_batch_size
+        self.max_queue_time = max_queue_time
+        self.unsupported_retry = unsupported_retry
+        self._unsupported_since = 0.0  # time.monotonic() of the last 404/405, 0 if batching works
+        self._pending: Dict[tuple, tuple] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: set = set()
+    
+    async def process(self, payload: Dict) -> Optional[Dict]:
+        """Queue a query and wait for its RAG response (None if unavailable)"""
+        if self._unsupported_since and time.monotonic() - self._unsupported_since < self.unsupported_retry:
+            return await call_service("rag", "query", "POST", payload)
+        
+        key = (payload["query"], payload.get("user_id"))
+        entry = self._pending.get(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            entry = (payload, loop.create_future())
+            self._pending[key] = entry
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_queue_time, self._flush)
+        
+        # Shield so one cancelled caller does not cancel the result for the others
+        return await asyncio.shield(entry[1])
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        batch = list(self._pending.values())
+        self._pending = {}
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+    
+    async def _send(self, batch: list):
+        results = None
+        try:
+            try:
+                results = await call_service("rag", "query_batch", "POST", [payload for payload, _ in batch])
+                self._unsupported_since = 0.0
+            except EndpointNotSupported as e:
+                logger.warning("%s; sending RAG queries individually", e)
+                self._unsupported_since = time.monotonic()
+                results = await asyncio.gather(
+                    *(call_service("rag", "query", "POST", payload) for payload, _ in batch)
+                )
+        finally:
+            if not isinstance(results, list) or len(results) != len(batch):
+                results = [None] * len(batch)
+            
+            # Stale fallback is tracked per query rather than per batch
+            for (payload, future), result in zip(batch, results):
+                key = stale_cache_key("rag", "query", payload)
+                if result is not None:
+                    remember_response(key, result)
+                else:
+                    result = stale_response("rag", key)
+                if not future.done():
+                    future.set_result(result)
+
+rag_batcher = RagBatcher()
 
 # Main query endpoint - calls RAG service which orchestrates everything
 @app.post("/api/query")
 async def process_query(request: QueryRequest):
     """Main query endpoint that routes through RAG service"""
     try:
-        logger.info(f"Gateway received query: {request.query}")
+        logger.info("Gateway received query: %s", request.query)
+        
+        cache_key = query_cache_key(request.query)
+        cached = await get_cached_response(cache_key)
+        if cached:
+            return cached
         
         # Call RAG service which will handle hospital and insurance integration
-        rag_response = await call_service("rag", "query", "POST", request.dict())
+        payload = request.model_dump()
+        rag_response = await rag_batcher.process(payload)
         
         if rag_response:
             logger.info("Successfully processed query through RAG service")
-            return {
+            response = {
                 "status": "success",
                 "data": rag_response,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso(),
                 "gateway": "main"
             }
+            if is_cacheable_answer(rag_response):
+                await cache_response(cache_key, response)
+            return response
         else:
             # Fallback: Try to get data from individual services and create a response
             logger.warning("RAG service unavailable, trying fallback approach")
             
-            # Try hospital service
-            hospital_data = await call_service("hospital", "search", "POST", request.dict())
-            insurance_data = await call_service("insurance", "search", "POST", request.dict())
+            # Query hospital and insurance services concurrently
+            hospital_data, insurance_data = await asyncio.gather(
+                call_service("hospital", "search", "POST", payload),
+                call_service("insurance", "search", "POST", payload),
+                return_exceptions=True
+            )
+            if isinstance(hospital_data, Exception):
+                hospital_data = None
+            if isinstance(insurance_data, Exception):
+                insurance_data = None
             
             # Create a fallback response
             fallback_answer = "I found the following information:\n"
@@ -246,12 +640,12 @@ async def process_query(request: QueryRequest):
                     "sources": sources,
                     "service": "gateway_fallback"
                 },
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso(),
                 "gateway": "main"
             }
             
     except Exception as e:
-        logger.error(f"Gateway query processing error: {str(e)}")
+        logger.error("Gateway query processing error: %s", e)
         return {
             "status": "error",
             "data": {
@@ -259,7 +653,7 @@ async def process_query(request: QueryRequest):
                 "confidence": 0.0,
                 "sources": {"error": str(e)}
             },
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
             "gateway": "main"
         }
 
@@ -267,7 +661,7 @@ async def process_query(request: QueryRequest):
 @app.post("/api/hospital/search")
 async def search_hospitals_direct(request: QueryRequest):
     """Direct hospital search when RAG is unavailable"""
-    result = await call_service("hospital", "search", "POST", request.dict())
+    result = await call_service("hospital", "search", "POST", request.model_dump())
     
     if result:
         return {"status": "success", "data": result}
@@ -280,7 +674,7 @@ async def search_hospitals_direct(request: QueryRequest):
 @app.post("/api/insurance/search")
 async def search_insurance_direct(request: QueryRequest):
     """Direct insurance search when RAG is unavailable"""
-    result = await call_service("insurance", "search", "POST", request.dict())
+    result = await call_service("insurance", "search", "POST", request.model_dump())
     
     if result:
         return {"status": "success", "data": result}
@@ -294,31 +688,38 @@ async def search_insurance_direct(request: QueryRequest):
 @app.get("/api/status")
 async def get_system_status():
     """Get detailed system status"""
-    return {
+    return ORJSONResponse({
         "gateway": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "circuit_breakers": circuit_breaker,
-        "services": SERVICES
-    }
+        "timestamp": now_iso(),
+        "circuit_breakers": {name: breaker.as_dict() for name, breaker in circuit_breakers.items()},
+        "services": SERVICES,
+        "query_cache": {
+            "enabled": REDIS is not None,
+            "hits": cache_stats["hits"],
+            "misses": cache_stats["misses"]
+        }
+    })
 
 # Reset circuit breakers endpoint (for admin use)
 @app.post("/api/admin/reset-breakers")
 async def reset_circuit_breakers():
     """Reset all circuit breakers"""
-    for service_name in circuit_breaker:
-        circuit_breaker[service_name] = {
-            "failures": 0,
-            "last_failure": None,
-            "open": False
-        }
+    for service_name in circuit_breakers:
+        circuit_breakers[service_name] = Breaker()
     
-    return {"message": "All circuit breakers reset", "timestamp": datetime.now().isoformat()}
+    return ORJSONResponse({"message": "All circuit breakers reset", "timestamp": now_iso()})
 
 if __name__ == "__main__":
+    DEV = bool(os.getenv("DEV"))
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=DEV,
+        # One worker per core in production; the reloader needs a single process
+        workers=None if DEV else os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        access_log=DEV,
+        log_level=os.getenv("LOG_LEVEL", "info" if DEV else "warning").lower()
     )
\ No newline at end of file
@@ -1,154 +1,217 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import logging
 from typing import List, Dict, Optional, Any
 import asyncio
+import os
 import httpx
+import orjson
+import msgspec
 from datetime import datetime
+import time
 import json
+import re
+from contextlib import asynccontextmanager
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - INFO under DEV, WARNING in production; LOG_LEVEL overrides
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO" if os.getenv("DEV") else "WARNING").upper())
 logger = logging.getLogger("rag_service")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one HTTP client for downstream calls and run service monitoring"""
+    # Plain-http localhost backends: HTTP/2 would need TLS/ALPN, so the win
+    # here is keeping pooled HTTP/1.1 connections warm between queries
+    app.state.http = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0)
+    )
+    
+    # Initial health check
+    await refresh_dependency_status()
+    
+    # Start background monitoring
+    monitor_task = asyncio.create_task(monitor_services())
+    logger.info("RAG service started with service monitoring")
+    
+    yield
+    
+    monitor_task.cancel()
+    await app.state.http.aclose()
+
 app = FastAPI(
     title="RAG Service",
     description="Retrieval Augmented Generation service for healthcare queries",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Compress larger JSON payloads
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Response timestamps, formatted at most once per second
+_timestamp_cache = ["", 0]
+
+def now_iso() -> str:
+    """Current local time in ISO format, at one-second granularity"""
+    second = int(time.time())
+    if second != _timestamp_cache[1]:
+        _timestamp_cache[0] = datetime.fromtimestamp(second).isoformat()
+        _timestamp_cache[1] = second
+    return _timestamp_cache[0]
+
 # Configuration
 HOSPITAL_SERVICE_URL = "http://localhost:8001"
 INSURANCE_SERVICE_URL = "http://localhost:8002"
 REQUEST_TIMEOUT = 10.0
+QUERY_DEADLINE = 4.0  # seconds to wait for hospital/insurance per query
+HEALTH_PROBE_TIMEOUT = 2.0
+MONITOR_INTERVAL_UP = 30  # seconds
+MONITOR_INTERVAL_DOWN = 2  # seconds
+
+# Outbound bodies are pre-encoded with orjson and sent as raw content
+JSON_HEADERS = {"content-type": "application/json"}
 
-# Request/Response models
-class QueryRequest(BaseModel):
+# Request/status models - msgspec structs, decoded straight from the request body
+class QueryRequest(msgspec.Struct, kw_only=True):
     query: str
     user_id: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
 
-class RAGResponse(BaseModel):
-    status: str
-    answer: str
-    sources: Dict[str, Any]
-    confidence: float
-    timestamp: str
-    service: str = "rag"
-
-class ServiceStatus(BaseModel):
+class ServiceStatus(msgspec.Struct):
     hospital: bool = False
     insurance: bool = False
     rag: bool = True
 
+_query_decoder = msgspec.json.Decoder(QueryRequest)
+_query_batch_decoder = msgspec.json.Decoder(List[QueryRequest])
+
+def decode_body(decoder: msgspec.json.Decoder, body: bytes):
+    """Decode and validate a JSON request body, rejecting bad input with a 422"""
+    try:
+        return decoder.decode(body)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 # Global service status tracking
 service_status = ServiceStatus()
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {
+    return ORJSONResponse({
         "status": "healthy",
         "service": "rag",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso(),
         "version": "1.0.0",
         "dependencies": {
             "hospital_service": service_status.hospital,
             "insurance_service": service_status.insurance
         }
-    }
+    })
 
 # Service health checker
 async def check_service_health(service_url: str, service_name: str) -> bool:
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{service_url}/health")
-            if response.status_code == 200:
-                logger.info(f"{service_name} service is healthy")
-                return True
-            else:
-                logger.warning(f"{service_name} service returned {response.status_code}")
-                return False
+        response = await app.state.http.head(f"{service_url}/health", timeout=HEALTH_PROBE_TIMEOUT)
+        if response.status_code < 400:
+            logger.info("%s service is healthy", service_name)
+            return True
+        else:
+            logger.warning("%s service returned %s", service_name, response.status_code)
+            return False
     except Exception as e:
-        logger.error(f"{service_name} service health check failed: {str(e)}")
+        logger.error("%s service health check failed: %s", service_name, e)
         return False
 
-# Background task to monitor service health
+# Probe both dependencies concurrently and record the results
+async def refresh_dependency_status():
+    service_status.hospital, service_status.insurance = await asyncio.gather(
+        check_service_health(HOSPITAL_SERVICE_URL, "Hospital"),
+        check_service_health(INSURANCE_SERVICE_URL, "Insurance")
+    )
+
+# Background task to monitor service health - polls quickly while a
+# dependency is down so recovery is noticed sooner
 async def monitor_services():
     while True:
-        service_status.hospital = await check_service_health(HOSPITAL_SERVICE_URL, "Hospital")
-        service_status.insurance = await check_service_health(INSURANCE_SERVICE_URL, "Insurance")
-        await asyncio.sleep(30)  # Check every 30 seconds
-
-# Start monitoring on startup
-@app.on_event("startup")
-async def startup_event():
-    # Initial health check
-    service_status.hospital = await check_service_health(HOSPITAL_SERVICE_URL, "Hospital")
-    service_status.insurance = await check_service_health(INSURANCE_SERVICE_URL, "Insurance")
-    
-    # Start background monitoring
-    asyncio.create_task(monitor_services())
-    logger.info("RAG service started with service monitoring")
+        await refresh_dependency_status()
+        all_up = service_status.hospital and service_status.insurance
+        await asyncio.sleep(MONITOR_INTERVAL_UP if all_up else MONITOR_INTERVAL_DOWN)
 
 # Safe service call with fallback
 async def safe_service_call(service_url: str, endpoint: str, data: Dict, service_name: str) -> Optional[Dict]:
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            url = f"{service_url}/{endpoint}"
-            logger.info(f"Calling {service_name} service: {url}")
-            
-            response = await client.post(url, json=data)
-            response.raise_for_status()
-            result = response.json()
-            
-            logger.info(f"{service_name} service responded successfully")
-            return result
-            
+        url = f"{service_url}/{endpoint}"
+        logger.info("Calling %s service: %s", service_name, url)
+        
+        response = await app.state.http.post(url, content=orjson.dumps(data), headers=JSON_HEADERS)
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        
+        logger.info("%s service responded successfully", service_name)
+        return result
+        
     except httpx.TimeoutException:
-        logger.error(f"{service_name} service timeout")
+        logger.error("%s service timeout", service_name)
         return None
     except httpx.RequestError as e:
-        logger.error(f"{service_name} service connection error: {str(e)}")
+        logger.error("%s service connection error: %s", service_name, e)
         return None
     except httpx.HTTPStatusError as e:
-        logger.error(f"{service_name} service HTTP error: {e.response.status_code}")
+        logger.error("%s service HTTP error: %s", service_name, e.response.status_code)
         return None
     except Exception as e:
-        logger.error(f"{service_name} service unexpected error: {str(e)}")
+        logger.error("%s service unexpected error: %s", service_name, e)
         return None
 
-# Generate AI-like response based on available data
-def generate_response(query: str, hospital_data: Optional[Dict], insurance_data: Optional[Dict]) -> tuple[str, float]:
+# Intent keywords, compiled once into single-pass alternations
+HOSPITAL_KEYWORDS = ('hospital', 'doctor', 'medical', 'treatment', 'emergency')
+INSURANCE_KEYWORDS = ('insurance', 'plan', 'coverage', 'premium', 'deductible')
+HOSPITAL_INTENT = re.compile("|".join(HOSPITAL_KEYWORDS))
+INSURANCE_INTENT = re.compile("|".join(INSURANCE_KEYWORDS))
+
+# Determine query intent as (is_hospital_query, is_insurance_query)
+def classify_query(query: str) -> tuple[bool, bool]:
     query_lower = query.lower()
-    
-    # Determine query intent
-    is_hospital_query = any(word in query_lower for word in ['hospital', 'doctor', 'medical', 'treatment', 'emergency'])
-    is_insurance_query = any(word in query_lower for word in ['insurance', 'plan', 'coverage', 'premium', 'deductible'])
+    return HOSPITAL_INTENT.search(query_lower) is not None, INSURANCE_INTENT.search(query_lower) is not None
+
+# Generate AI-like response based on available data
+def generate_response(intent: tuple[bool, bool], hospital_data: Optional[Dict], insurance_data: Optional[Dict]) -> tuple[str, float]:
+    is_hospital_query, is_insurance_query = intent
     
     response_parts = []
     confidence = 0.0
+    # A one-sided query is fully answered by its own source (the other one
+    # is not called at all), so that source carries both weights
+    source_weight = 0.8 if is_hospital_query != is_insurance_query else 0.4
     
     # Process hospital data
     if hospital_data and hospital_data.get('status') == 'success':
         hospitals = hospital_data.get('data', [])
         if hospitals:
-            confidence += 0.4
+            confidence += source_weight
             if is_hospital_query or not is_insurance_query:
                 response_parts.append(f"I found {len(hospitals)} relevant hospitals for you:")
-                for hospital in hospitals[:3]:  # Limit to top 3
-                    response_parts.append(f"• {hospital['name']} - {hospital['location']}, Rating: {hospital['rating']}/5")
+                response_parts.extend(  # Limit to top 3
+                    f"• {hospital['name']} - {hospital['location']}, Rating: {hospital['rating']}/5"
+                    for hospital in hospitals[:3]
+                )
     
     # Process insurance data
     if insurance_data and insurance_data.get('status') == 'success':
         insurance_plans = insurance_data.get('data', [])
         if insurance_plans:
-            confidence += 0.4
+            confidence += source_weight
             if is_insurance_query or not is_hospital_query:
                 response_parts.append(f"I found {len(insurance_plans)} relevant insurance plans:")
-                for plan in insurance_plans[:3]:  # Limit to top 3
-                    response_parts.append(f"• {plan['plan_name']} by {plan['provider']} - ${plan['monthly_premium']}/month")
+                response_parts.extend(  # Limit to top 3
+                    f"• {plan['plan_name']} by {plan['provider']} - ${plan['monthly_premium']}/month"
+                    for plan in insurance_plans[:3]
+                )
     
     # Fallback responses
     if not response_parts:
@@ -168,74 +231,117 @@ def generate_response(query: str, hospital_data: Optional[Dict], insurance_data:
     
     return "\n".join(response_parts), confidence
 
-# Main RAG endpoint
-@app.post("/query", response_model=RAGResponse)
-async def process_query(request: QueryRequest):
+# Source entry for a service that was not needed for the query
+SKIPPED_SOURCE = {"status": "skipped", "message": "Not needed for this query"}
+
+# Answer a single query from hospital and insurance data
+async def answer_query(request: QueryRequest) -> Dict[str, Any]:
     try:
-        logger.info(f"Processing RAG query: {request.query}")
+        logger.info("Processing RAG query: %s", request.query)
         
         query_data = {"query": request.query, "user_id": request.user_id}
         
-        # Parallel calls to both services with fallback handling
-        tasks = []
+        # A query that only matches one intent does not need the other service;
+        # if it matches both or neither, ask both
+        intent = classify_query(request.query)
+        is_hospital_query, is_insurance_query = intent
+        skip_hospital = is_insurance_query and not is_hospital_query
+        skip_insurance = is_hospital_query and not is_insurance_query
+        if skip_hospital or skip_insurance:
+            logger.info("Skipping %s service for one-sided query: %s", "hospital" if skip_hospital else "insurance", request.query)
         
-        if service_status.hospital:
-            tasks.append(safe_service_call(HOSPITAL_SERVICE_URL, "search", query_data, "Hospital"))
-        else:
-            tasks.append(asyncio.create_task(asyncio.sleep(0, result=None)))
+        # Parallel calls to the available services; unavailable ones stay None
+        calls = {}
+        
+        if service_status.hospital and not skip_hospital:
+            calls["hospital"] = safe_service_call(HOSPITAL_SERVICE_URL, "search", query_data, "Hospital")
             
-        if service_status.insurance:
-            tasks.append(safe_service_call(INSURANCE_SERVICE_URL, "search", query_data, "Insurance"))
-        else:
-            tasks.append(asyncio.create_task(asyncio.sleep(0, result=None)))
+        if service_status.insurance and not skip_insurance:
+            calls["insurance"] = safe_service_call(INSURANCE_SERVICE_URL, "search", query_data, "Insurance")
+        
+        # Wait for the called services up to QUERY_DEADLINE; a slow service
+        # is cancelled and the answer is built from whatever has returned
+        results = {}
+        if calls:
+            tasks = {name: asyncio.create_task(call) for name, call in calls.items()}
+            done, pending = await asyncio.wait(tasks.values(), timeout=QUERY_DEADLINE)
+            for task in pending:
+                task.cancel()
+            
+            for name, task in tasks.items():
+                if task in done:
+                    results[name] = task.exception() or task.result()
+                else:
+                    logger.warning("%s service missed the %ss query deadline", name, QUERY_DEADLINE)
         
-        # Wait for both services (or timeouts)
-        hospital_result, insurance_result = await asyncio.gather(*tasks, return_exceptions=True)
+        hospital_result = results.get("hospital")
+        insurance_result = results.get("insurance")
         
         # Handle exceptions
         if isinstance(hospital_result, Exception):
-            logger.error(f"Hospital service exception: {hospital_result}")
+            logger.error("Hospital service exception: %s", hospital_result)
             hospital_result = None
             
         if isinstance(insurance_result, Exception):
-            logger.error(f"Insurance service exception: {insurance_result}")
+            logger.error("Insurance service exception: %s", insurance_result)
             insurance_result = None
         
         # Generate response
-        answer, confidence = generate_response(request.query, hospital_result, insurance_result)
+        answer, confidence = generate_response(intent, hospital_result, insurance_result)
         
         # Prepare sources
         sources = {
             "hospital": {
                 "available": hospital_result is not None,
-                "data": hospital_result if hospital_result else {"status": "unavailable", "message": "Hospital service is currently down"}
+                "data": hospital_result if hospital_result else
+                    SKIPPED_SOURCE if skip_hospital else {"status": "unavailable", "message": "Hospital service is currently down"}
             },
             "insurance": {
                 "available": insurance_result is not None,
-                "data": insurance_result if insurance_result else {"status": "unavailable", "message": "Insurance service is currently down"}
+                "data": insurance_result if insurance_result else
+                    SKIPPED_SOURCE if skip_insurance else {"status": "unavailable", "message": "Insurance service is currently down"}
             }
         }
         
-        logger.info(f"RAG response generated with confidence: {confidence}")
+        logger.info("RAG response generated with confidence: %s", confidence)
         
-        return RAGResponse(
-            status="success",
-            answer=answer,
-            sources=sources,
-            confidence=confidence,
-            timestamp=datetime.now().isoformat()
-        )
+        # Flag answers built while a needed source was down or failing, so
+        # callers can tell them apart from complete answers (and not cache them)
+        degraded = any(source["data"].get("status") not in ("success", "skipped") for source in sources.values())
+        
+        return {
+            "status": "success",
+            "answer": answer,
+            "sources": sources,
+            "confidence": confidence,
+            "degraded": degraded,
+            "timestamp": now_iso(),
+            "service": "rag"
+        }
         
     except Exception as e:
-        logger.error(f"RAG service error: {str(e)}")
+        logger.error("RAG service error: %s", e)
         # Return graceful error response instead of HTTP exception
-        return RAGResponse(
-            status="error",
-            answer="I'm experiencing some technical difficulties right now. Please try again in a moment.",
-            sources={"error": str(e)},
-            confidence=0.0,
-            timestamp=datetime.now().isoformat()
-        )
+        return {
+            "status": "error",
+            "answer": "I'm experiencing some technical difficulties right now. Please try again in a moment.",
+            "sources": {"error": str(e)},
+            "confidence": 0.0,
+            "timestamp": now_iso(),
+            "service": "rag"
+        }
+
+# Main RAG endpoint
+@app.post("/query")
+async def process_query(request: Request):
+    query_request = decode_body(_query_decoder, await request.body())
+    return ORJSONResponse(await answer_query(query_request))
+
+# Batch RAG endpoint - the gateway submits concurrent queries together
+@app.post("/query_batch")
+async def process_query_batch(request: Request):
+    query_requests = decode_body(_query_batch_decoder, await request.body())
+    return ORJSONResponse(await asyncio.gather(*(answer_query(query_request) for query_request in query_requests)))
 
 # Service status endpoint
 @app.get("/status")
@@ -246,14 +352,13 @@ async def get_service_status():
             "hospital_service": "healthy" if service_status.hospital else "unhealthy",
             "insurance_service": "healthy" if service_status.insurance else "unhealthy"
         },
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     }
 
 # Manual service health refresh
 @app.post("/refresh-services")
 async def refresh_service_status():
-    service_status.hospital = await check_service_health(HOSPITAL_SERVICE_URL, "Hospital")
-    service_status.insurance = await check_service_health(INSURANCE_SERVICE_URL, "Insurance")
+    await refresh_dependency_status()
     
     return {
         "message": "Service status refreshed",
@@ -264,10 +369,16 @@ async def refresh_service_status():
     }
 
 if __name__ == "__main__":
+    DEV = bool(os.getenv("DEV"))
     uvicorn.run(
         "rag_server:app",
         host="0.0.0.0",
         port=8003,
-        reload=True,
-        log_level="info"
+        reload=DEV,
+        # One worker per core in production; the reloader needs a single process
+        workers=None if DEV else os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        access_log=DEV,
+        log_level=os.getenv("LOG_LEVEL", "info" if DEV else "warning").lower()
     )
\ No newline at end of file